@@ -2,41 +2,112 @@
 Query Script for Movie Plots
 Search for movies by keyword and return top results by plot length
 """
-import pandas as pd
-import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import orjson
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+
+# Hive-style decade=XXXX directories; typed to match the decade column in the files
+DECADE_PARTITIONING = ds.partitioning(pa.schema([('decade', pa.int64())]), flavor='hive')
+
+# Columns needed to build a search result row, and the keys they are emitted under
+RESULT_COLUMNS = ['title', 'plot_length', 'decade', 'release_year', 'genre']
+RESULT_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('plot_length', pa.int64()),
+    ('decade', pa.int64()),
+    ('year', pa.int64()),
+    ('genre', pa.string())
+])
 
 
 class MovieQueryEngine:
-    def __init__(self, parquet_dir: str = "output/parquet"):
+    def __init__(self, parquet_dir: str = "output/parquet", build_index: bool = False):
         self.parquet_dir = Path(parquet_dir)
+        self._vocab = None
+        self._postings = None
         self._load_data()
+        
+        # The token index costs seconds and several hundred MB to build on the
+        # full dataset, so it only pays off for long-lived, query-heavy engines
+        if build_index:
+            self._build_index()
     
     def _load_data(self):
-        """Load all partitioned Parquet files"""
+        """Load all partitioned Parquet files into a single Arrow table"""
         print(f"📂 Loading data from {self.parquet_dir}...")
         
-        dfs = []
-        for partition_dir in self.parquet_dir.glob('decade=*'):
-            parquet_file = partition_dir / 'data.parquet'
-            if parquet_file.exists():
-                df = pd.read_parquet(parquet_file)
-                dfs.append(df)
-        
-        if not dfs:
+        if not any(self.parquet_dir.glob('decade=*/*.parquet')):
             raise ValueError(f"No Parquet files found in {self.parquet_dir}")
         
-        self.df = pd.concat(dfs, ignore_index=True)
-        print(f"✅ Loaded {len(self.df)} total rows from {len(dfs)} partitions")
+        # Memory-mapped reads; each partition becomes a chunk of the table, no concat copy
+        dataset = ds.dataset(
+            self.parquet_dir,
+            format='parquet',
+            partitioning=DECADE_PARTITIONING,
+            filesystem=fs.LocalFileSystem(use_mmap=True)
+        )
+        table = dataset.to_table(columns=RESULT_COLUMNS + ['plot'])
+        
+        # Case-fold plots once so each search is a plain substring match
+        self._plot_lower = pc.utf8_lower(table['plot'])
+        self.table = table.select(RESULT_COLUMNS)
+        print(f"✅ Loaded {self.table.num_rows} total rows from {len(dataset.files)} partitions")
+    
+    def _build_index(self):
+        """Build an inverted index from each distinct plot token to the rows containing it"""
+        tokens = pc.utf8_split_whitespace(self._plot_lower.combine_chunks())
+        pairs = pa.table({
+            'token': pc.list_flatten(tokens),
+            'row_id': pc.list_parent_indices(tokens)
+        })
+        index = pairs.group_by('token').aggregate([('row_id', 'distinct')])
+        self._vocab = index['token']
+        self._postings = index['row_id_distinct']
+        print(f"✅ Indexed {len(self._vocab)} distinct tokens")
+    
+    def _match_rows(self, keyword: str) -> pa.Table:
+        """Return the rows whose plot contains keyword (case-insensitive)"""
+        keyword = keyword.lower()
+        if self._vocab is None or any(ch.isspace() for ch in keyword):
+            # No index, or a phrase that can span tokens: scan the pre-lowercased plots
+            return self.table.filter(pc.match_substring(self._plot_lower, keyword))
+        
+        # A keyword without whitespace always lies inside a single token, so
+        # matching it against the vocabulary finds exactly the same rows
+        hits = self._postings.filter(pc.match_substring(self._vocab, keyword))
+        row_ids = pc.unique(pc.list_flatten(hits))
+        row_ids = pc.take(row_ids, pc.sort_indices(row_ids))
+        return self.table.take(row_ids)
+    
+    def _top_n_indices(self, plot_length: pa.ChunkedArray, top_n: int) -> np.ndarray:
+        """Indices of the top_n longest plots, longest first, ties kept in row order"""
+        lengths = plot_length.to_numpy()
+        if top_n <= 0:
+            return np.array([], dtype=np.int64)
+        if top_n < len(lengths):
+            # O(n) partition to find the cut-off, then sort only the rows that reach it
+            threshold = np.partition(lengths, -top_n)[-top_n]
+            candidates = np.flatnonzero(lengths >= threshold)
+        else:
+            candidates = np.arange(len(lengths))
+        order = np.argsort(-lengths[candidates], kind='stable')
+        return candidates[order[:top_n]]
     
-    def search_by_keyword(self, keyword: str, top_n: int = 5) -> Dict:
+    def search_by_keyword(self, keyword: str, top_n: int = 5,
+                          min_plot_length: Optional[int] = None) -> Dict:
         """
         Search for movies containing keyword and return top N by plot length
         
         Args:
             keyword: Search term to find in plots
             top_n: Number of top results to return
+            min_plot_length: Only consider plots with at least this many words
             
         Returns:
             Dictionary with keyword and results list
@@ -44,28 +115,24 @@ class MovieQueryEngine:
         print(f"\n🔍 Searching for keyword: '{keyword}'")
         
         # Case-insensitive search
-        mask = self.df['plot'].str.contains(keyword, case=False, na=False)
-        matching = self.df[mask].copy()
+        matching = self._match_rows(keyword)
+        if min_plot_length is not None:
+            matching = matching.filter(pc.greater_equal(matching['plot_length'], min_plot_length))
         
-        print(f"  - Found {len(matching)} movies matching '{keyword}'")
+        print(f"  - Found {matching.num_rows} movies matching '{keyword}'")
         
         # Sort by plot length descending and take top N
-        top_results = matching.nlargest(top_n, 'plot_length')
+        top_results = matching.take(self._top_n_indices(matching['plot_length'], top_n))
         
-        # Format results
-        results = []
-        for _, row in top_results.iterrows():
-            results.append({
-                'title': row['title'],
-                'plot_length': int(row['plot_length']),
-                'decade': int(row['decade']),
-                'year': int(row['release_year']) if pd.notna(row['release_year']) else None,
-                'genre': row.get('genre', 'unknown')
-            })
+        # Format results straight from the columnar buffers
+        results = (top_results
+                   .rename_columns(RESULT_SCHEMA.names)
+                   .cast(RESULT_SCHEMA)
+                   .to_pylist())
         
         output = {
             'keyword': keyword,
-            'total_matches': len(matching),
+            'total_matches': matching.num_rows,
             'results': results
         }
         
@@ -74,8 +141,7 @@ class MovieQueryEngine:
     def save_query_results(self, results: Dict, output_file: str = "query_results.json"):
         """Save query results to JSON file"""
         output_path = Path(output_file)
-        with open(output_path, 'w') as f:
-            json.dump(results, f, indent=2)
+        output_path.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
         print(f"\n💾 Results saved to {output_path}")
     
     def print_results(self, results: Dict):